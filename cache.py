@@ -0,0 +1,85 @@
+from typing import Optional, Tuple
+import os
+import redis.asyncio as redis
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Redis URL from environment variable; caching is disabled when unset
+REDIS_URL = os.getenv("REDIS_URL")
+
+# Seconds a cached person body stays valid
+PERSON_CACHE_TTL = int(os.getenv("PERSON_CACHE_TTL", "300"))
+
+# Seconds to wait for Redis to connect or answer before falling back to the
+# database; redis-py waits indefinitely by default
+REDIS_TIMEOUT = float(os.getenv("REDIS_TIMEOUT", "0.1"))
+
+# Create Redis client
+redis_client: Optional[redis.Redis] = (
+    redis.from_url(
+        REDIS_URL,
+        socket_timeout=REDIS_TIMEOUT,
+        socket_connect_timeout=REDIS_TIMEOUT,
+    )
+    if REDIS_URL
+    else None
+)
+
+# Bumped on every invalidation so a GET that read the database before a
+# concurrent write cannot cache the old body afterwards. Kept far longer than
+# any request so it never expires between a read and its cache write.
+PERSON_VERSION_TTL = 24 * 60 * 60
+
+# Cache the body only if the version still matches what the reader saw
+CACHE_IF_CURRENT = """
+if (redis.call('GET', KEYS[2]) or '0') == ARGV[2] then
+    redis.call('SET', KEYS[1], ARGV[1], 'EX', ARGV[3])
+end
+"""
+
+def person_key(person_id: int) -> str:
+    return f"persons:{person_id}"
+
+def version_key(person_id: int) -> str:
+    return f"persons:{person_id}:version"
+
+# The cache is best-effort: Redis errors fall back to the database, and the
+# TTL bounds staleness if an invalidation is lost.
+async def get_cached_person(person_id: int) -> Tuple[Optional[bytes], Optional[bytes]]:
+    """Cached body and the invalidation version to pass to cache_person"""
+    if redis_client is None:
+        return None, None
+    try:
+        body, version = await redis_client.mget(person_key(person_id), version_key(person_id))
+    except redis.RedisError:
+        return None, None
+    return body, version or b"0"
+
+async def cache_person(person_id: int, body: bytes, version: Optional[bytes]) -> None:
+    if redis_client is None or version is None:
+        return
+    try:
+        await redis_client.eval(
+            CACHE_IF_CURRENT, 2,
+            person_key(person_id), version_key(person_id),
+            body, version, PERSON_CACHE_TTL
+        )
+    except redis.RedisError:
+        pass
+
+async def invalidate_person(person_id: int) -> None:
+    if redis_client is None:
+        return
+    try:
+        pipe = redis_client.pipeline(transaction=True)
+        pipe.incr(version_key(person_id))
+        pipe.expire(version_key(person_id), PERSON_VERSION_TTL)
+        pipe.delete(person_key(person_id))
+        await pipe.execute()
+    except redis.RedisError:
+        pass
+
+async def close_cache() -> None:
+    if redis_client is not None:
+        await redis_client.aclose()
@@ -1,48 +1,195 @@
-from fastapi import FastAPI, HTTPException, Depends
-from pydantic import BaseModel
-from typing import List, Optional
-from sqlalchemy.orm import Session
-from sqlalchemy import text
-from database import engine, get_db, Base
+from contextlib import asynccontextmanager
+import re
+import msgspec
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.exceptions import RequestValidationError
+from fastapi.responses import Response
+from typing import Any, List, Optional, TypeVar
+from sqlalchemy import case, delete, insert, select, text, update
+from sqlalchemy.exc import IntegrityError
+from database import AUTO_CREATE_TABLES, DBSessionMiddleware, get_current_session, init_models
+from cache import cache_person, close_cache, get_cached_person, invalidate_person
 from models import PersonModel
 
-app = FastAPI(title="Person API", version="1.0.0")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Create database tables
+    if AUTO_CREATE_TABLES:
+        await init_models()
+    yield
+    await close_cache()
 
-# Create database tables
-Base.metadata.create_all(bind=engine)
+app = FastAPI(
+    title="Person API",
+    version="1.0.0",
+    lifespan=lifespan,
+)
+app.add_middleware(DBSessionMiddleware)
 
 # Person model
-class Person(BaseModel):
+# gc=False: the structs only hold scalars, so they never form reference
+# cycles and need no GC tracking (cheaper decoding of large bulk bodies).
+class Person(msgspec.Struct, gc=False):
     id: int
     name: str
     age: int
     email: str
-    
-    class Config:
-        from_attributes = True
 
-class PersonCreate(BaseModel):
+class PersonCreate(msgspec.Struct, gc=False):
     name: str
     age: int
     email: str
 
-class PersonUpdate(BaseModel):
+class PersonUpdate(msgspec.Struct, gc=False):
     name: Optional[str] = None
     age: Optional[int] = None
     email: Optional[str] = None
 
-# Pydantic schemas remain for API validation
+# msgspec schemas handle API validation and serialization
+
+# Decoders and encoder built once at import instead of per request.
+# strict=False keeps the lax coercions clients relied on (e.g. "30" -> 30).
+PERSON_CREATE_DECODER = msgspec.json.Decoder(PersonCreate, strict=False)
+PERSON_CREATE_LIST_DECODER = msgspec.json.Decoder(List[PersonCreate], strict=False)
+PERSON_UPDATE_DECODER = msgspec.json.Decoder(PersonUpdate, strict=False)
+ENCODER = msgspec.json.Encoder()
+
+# Errors are built per raise: a shared instance would keep the last request's
+# traceback and context alive and be mutated by concurrent requests
+def not_found() -> HTTPException:
+    return HTTPException(status_code=404, detail="Person not found")
+
+def email_taken() -> HTTPException:
+    return HTTPException(status_code=400, detail="Email already registered")
+
+T = TypeVar("T")
+
+def openapi_schemas(*types: Any) -> List[dict]:
+    """JSON schemas for msgspec types, built in one pass with $refs inlined"""
+    schemas, components = msgspec.json.schema_components(types, ref_template="{name}")
+    
+    def resolve(node: Any) -> Any:
+        if isinstance(node, dict):
+            if "$ref" in node:
+                return resolve(components[node["$ref"]])
+            return {key: resolve(value) for key, value in node.items()}
+        if isinstance(node, list):
+            return [resolve(value) for value in node]
+        return node
+    
+    return [resolve(schema) for schema in schemas]
+
+# OpenAPI schemas built once at import and shared by every route
+(
+    PERSON_SCHEMA,
+    PERSON_LIST_SCHEMA,
+    PERSON_CREATE_SCHEMA,
+    PERSON_CREATE_LIST_SCHEMA,
+    PERSON_UPDATE_SCHEMA,
+) = openapi_schemas(Person, List[Person], PersonCreate, List[PersonCreate], PersonUpdate)
+
+def json_content(schema: dict) -> dict:
+    """OpenAPI JSON content entry for a prebuilt schema"""
+    return {"content": {"application/json": {"schema": schema}}}
+
+def json_body(schema: dict) -> dict:
+    """OpenAPI request body for handlers that parse the raw body themselves"""
+    return {"requestBody": {"required": True, **json_content(schema)}}
+
+# Pydantic error type and message for msgspec's "Expected `X`, got `Y`"
+EXPECTED_TYPE_ERRORS = {
+    "int": ("int_type", "Input should be a valid integer"),
+    "str": ("string_type", "Input should be a valid string"),
+    "array": ("list_type", "Input should be a valid list"),
+    "object": ("model_attributes_type", "Input should be a valid dictionary or object to extract fields from"),
+}
+INT_PARSING_ERROR = ("int_parsing", "Input should be a valid integer, unable to parse string as an integer")
+
+def validation_error(e: msgspec.ValidationError) -> dict:
+    """Translate a msgspec error into the 422 error entry Pydantic produced"""
+    message, _, path = str(e).partition(" - at `$")
+    loc = ["body"]
+    for key, index in re.findall(r"\.(\w+)|\[(\d+)\]", path.rstrip("`")):
+        loc.append(key or int(index))
+    
+    missing = re.match(r"Object missing required field `(\w+)`$", message)
+    if missing:
+        loc.append(missing.group(1))
+        return {"type": "missing", "loc": tuple(loc), "msg": "Field required", "input": None}
+    
+    expected = re.match(r"Expected `(\w+)(?: \| null)?`, got `(\w+)`$", message)
+    if expected:
+        if expected.group(1) == "int" and expected.group(2) == "str":
+            error_type, msg = INT_PARSING_ERROR
+        else:
+            error_type, msg = EXPECTED_TYPE_ERRORS.get(expected.group(1), ("value_error", message))
+        return {"type": error_type, "loc": tuple(loc), "msg": msg, "input": None}
+    
+    return {"type": "value_error", "loc": tuple(loc), "msg": message, "input": None}
+
+async def parse_body(request: Request, decoder: "msgspec.json.Decoder[T]") -> T:
+    """Decode and validate the raw request body in one pass"""
+    body = await request.body()
+    if not body:
+        raise RequestValidationError([
+            {"type": "missing", "loc": ("body",), "msg": "Field required", "input": None}
+        ])
+    try:
+        return decoder.decode(body)
+    except msgspec.ValidationError as e:
+        raise RequestValidationError([validation_error(e)])
+    except msgspec.DecodeError as e:
+        # Malformed JSON, reported like FastAPI's own JSON parsing errors
+        position = re.search(r"\(byte (\d+)\)", str(e))
+        loc = ("body", int(position.group(1))) if position else ("body",)
+        raise RequestValidationError([{
+            "type": "json_invalid",
+            "loc": loc,
+            "msg": "JSON decode error",
+            "input": {},
+            "ctx": {"error": str(e)}
+        }])
+
+def to_person(person: PersonModel) -> Person:
+    """Build a Person from a trusted DB row"""
+    return Person(
+        id=person.id,
+        name=person.name,
+        age=person.age,
+        email=person.email
+    )
+
+# person_json holds the body without "id", so it can be written in the same
+# INSERT/UPDATE as the row; the id is spliced in at read time
+def with_id(person_id: int, person_json: bytes) -> bytes:
+    """Full Person JSON from a stored body"""
+    return b'{"id":%d,' % person_id + person_json[1:]
+
+def stored_json(person: PersonModel) -> bytes:
+    """Person JSON for a row, encoding rows written before person_json existed"""
+    if person.person_json is None:
+        return ENCODER.encode(to_person(person))
+    return with_id(person.id, person.person_json)
+
+def json_response(obj: Any, status_code: int = 200) -> Response:
+    """Encode straight to JSON bytes with the shared msgspec encoder"""
+    return Response(
+        ENCODER.encode(obj),
+        status_code=status_code,
+        media_type="application/json"
+    )
 
 @app.get("/")
-def root():
+async def root():
     return {"message": "Person API - Use /docs for API documentation"}
 
 @app.get("/health")
-def healthcheck(db: Session = Depends(get_db)):
+async def healthcheck():
     """Check API and database health"""
+    db = get_current_session()
     try:
         # Test database connection
-        db.execute(text("SELECT 1"))
+        await db.execute(text("SELECT 1"))
         return {
             "status": "healthy",
             "api": "operational",
@@ -59,72 +206,167 @@ def healthcheck(db: Session = Depends(get_db)):
             }
         )
 
-@app.get("/persons", response_model=List[Person])
-def get_all_persons(db: Session = Depends(get_db)):
+@app.get("/persons", responses={200: json_content(PERSON_LIST_SCHEMA)})
+async def get_all_persons():
     """Get all persons"""
-    persons = db.query(PersonModel).all()
-    return persons
+    db = get_current_session()
+    # Column tuples skip ORM hydration; stored bodies only get their id spliced
+    # in. The columns are only sent for legacy rows without a stored body.
+    legacy = PersonModel.person_json.is_(None)
+    rows = (await db.execute(select(
+        PersonModel.id,
+        PersonModel.person_json,
+        case((legacy, PersonModel.name)),
+        case((legacy, PersonModel.age)),
+        case((legacy, PersonModel.email))
+    ))).all()
+    body = b"[" + b",".join(
+        with_id(r[0], r[1]) if r[1] is not None else ENCODER.encode(Person(r[0], *r[2:]))
+        for r in rows
+    ) + b"]"
+    return Response(body, media_type="application/json")
 
-@app.get("/persons/{person_id}", response_model=Person)
-def get_person(person_id: int, db: Session = Depends(get_db)):
+@app.get("/persons/{person_id}", responses={200: json_content(PERSON_SCHEMA)})
+async def get_person(person_id: int):
     """Get a specific person by ID"""
-    person = db.query(PersonModel).filter(PersonModel.id == person_id).first()
+    db = get_current_session()
+    cached, version = await get_cached_person(person_id)
+    if cached is not None:
+        return Response(cached, media_type="application/json")
+    
+    person = await db.get(PersonModel, person_id)
     if not person:
-        raise HTTPException(status_code=404, detail="Person not found")
-    return person
+        raise not_found()
+    body = stored_json(person)
+    await cache_person(person_id, body, version)
+    return Response(body, media_type="application/json")
 
-@app.post("/persons", response_model=Person, status_code=201)
-def create_person(person_data: PersonCreate, db: Session = Depends(get_db)):
+@app.post(
+    "/persons",
+    status_code=201,
+    responses={201: json_content(PERSON_SCHEMA)},
+    openapi_extra=json_body(PERSON_CREATE_SCHEMA),
+)
+async def create_person(request: Request):
     """Create a new person"""
-    # Check if email already exists
-    existing_person = db.query(PersonModel).filter(PersonModel.email == person_data.email).first()
-    if existing_person:
-        raise HTTPException(status_code=400, detail="Email already registered")
-    
+    db = get_current_session()
+    person_data = await parse_body(request, PERSON_CREATE_DECODER)
     db_person = PersonModel(
         name=person_data.name,
         age=person_data.age,
-        email=person_data.email
+        email=person_data.email,
+        person_json=ENCODER.encode(person_data)
     )
     db.add(db_person)
-    db.commit()
-    db.refresh(db_person)
+    # Rely on the unique index on email instead of a pre-SELECT
+    try:
+        await db.commit()
+    except IntegrityError:
+        await db.rollback()
+        raise email_taken() from None
     
-    return db_person
+    # The INSERT already fetched the id and expire_on_commit is off,
+    # so no refresh round-trip is needed
+    return Response(stored_json(db_person), status_code=201, media_type="application/json")
 
-@app.put("/persons/{person_id}", response_model=Person)
-def update_person(person_id: int, person_data: PersonUpdate, db: Session = Depends(get_db)):
-    """Update an existing person"""
-    person = db.query(PersonModel).filter(PersonModel.id == person_id).first()
-    if not person:
-        raise HTTPException(status_code=404, detail="Person not found")
+@app.post(
+    "/persons/bulk",
+    status_code=201,
+    responses={201: json_content(PERSON_LIST_SCHEMA)},
+    openapi_extra=json_body(PERSON_CREATE_LIST_SCHEMA),
+)
+async def create_persons_bulk(request: Request):
+    """Create several persons with a single multi-row INSERT"""
+    db = get_current_session()
+    people = await parse_body(request, PERSON_CREATE_LIST_DECODER)
+    if not people:
+        return json_response([], status_code=201)
     
+    # executemany with RETURNING is batched into multi-row VALUES by SQLAlchemy
+    stmt = insert(PersonModel).returning(PersonModel.id, sort_by_parameter_order=True)
+    params = [
+        {**msgspec.structs.asdict(p), "person_json": ENCODER.encode(p)} for p in people
+    ]
+    try:
+        ids = (await db.execute(stmt, params)).scalars().all()
+        await db.commit()
+    except IntegrityError:
+        await db.rollback()
+        raise email_taken() from None
+    body = b"[" + b",".join(
+        with_id(person_id, p["person_json"]) for person_id, p in zip(ids, params)
+    ) + b"]"
+    return Response(body, status_code=201, media_type="application/json")
+
+@app.put(
+    "/persons/{person_id}",
+    responses={200: json_content(PERSON_SCHEMA)},
+    openapi_extra=json_body(PERSON_UPDATE_SCHEMA),
+)
+async def update_person(person_id: int, request: Request):
+    """Update an existing person"""
+    db = get_current_session()
+    person_data = await parse_body(request, PERSON_UPDATE_DECODER)
     # Update only provided fields
-    if person_data.name is not None:
-        person.name = person_data.name
-    if person_data.age is not None:
-        person.age = person_data.age
-    if person_data.email is not None:
-        # Check if new email already exists for another user
-        existing = db.query(PersonModel).filter(
-            PersonModel.email == person_data.email,
-            PersonModel.id != person_id
-        ).first()
-        if existing:
-            raise HTTPException(status_code=400, detail="Email already registered")
-        person.email = person_data.email
+    values = {
+        field: getattr(person_data, field)
+        for field in PersonUpdate.__struct_fields__
+        if getattr(person_data, field) is not None
+    }
+    if not values:
+        person = await db.get(PersonModel, person_id)
+        if not person:
+            raise not_found()
+        return Response(stored_json(person), media_type="application/json")
     
-    db.commit()
-    db.refresh(person)
-    return person
+    where = PersonModel.id == person_id
+    # Email uniqueness is enforced by the unique index
+    try:
+        if len(values) == len(PersonUpdate.__struct_fields__):
+            # Full update: the stored body is known up front, so a single
+            # UPDATE writes the row and its body together
+            person_json = ENCODER.encode(PersonCreate(**values))
+            stmt = (
+                update(PersonModel)
+                .where(where)
+                .values(**values, person_json=person_json)
+                .returning(PersonModel.id)
+            )
+            if (await db.execute(stmt)).scalar_one_or_none() is None:
+                raise not_found()
+        else:
+            # Partial update: the body needs the unchanged fields, so read them
+            # back from the UPDATE itself (under its row lock) and store the
+            # body in the same transaction; a separate read could be stale
+            stmt = (
+                update(PersonModel)
+                .where(where)
+                .values(**values)
+                .returning(PersonModel.name, PersonModel.age, PersonModel.email)
+            )
+            row = (await db.execute(stmt)).one_or_none()
+            if row is None:
+                raise not_found()
+            person_json = ENCODER.encode(PersonCreate(*row))
+            await db.execute(
+                update(PersonModel).where(where).values(person_json=person_json)
+            )
+        await db.commit()
+    except IntegrityError:
+        await db.rollback()
+        raise email_taken() from None
+    await invalidate_person(person_id)
+    return Response(with_id(person_id, person_json), media_type="application/json")
 
 @app.delete("/persons/{person_id}", status_code=204)
-def delete_person(person_id: int, db: Session = Depends(get_db)):
+async def delete_person(person_id: int):
     """Delete a person"""
-    person = db.query(PersonModel).filter(PersonModel.id == person_id).first()
-    if not person:
-        raise HTTPException(status_code=404, detail="Person not found")
+    db = get_current_session()
+    stmt = delete(PersonModel).where(PersonModel.id == person_id).returning(PersonModel.id)
+    deleted_id = (await db.execute(stmt)).scalar_one_or_none()
+    if deleted_id is None:
+        raise not_found()
     
-    db.delete(person)
-    db.commit()
+    await db.commit()
+    await invalidate_person(person_id)
     return None
@@ -1,10 +1,15 @@
-from sqlalchemy import Column, Integer, String
+from sqlalchemy import Column, Integer, LargeBinary, String
 from database import Base
 
 class PersonModel(Base):
     __tablename__ = "persons"
+    # Fetch server-generated values in the INSERT itself (RETURNING)
+    __mapper_args__ = {"eager_defaults": True}
 
     id = Column(Integer, primary_key=True, index=True, autoincrement=True)
     name = Column(String, nullable=False)
     age = Column(Integer, nullable=False)
     email = Column(String, unique=True, nullable=False, index=True)
+    # Pre-encoded JSON body of the row without "id", written in the same
+    # INSERT/UPDATE as the row so reads can return it without serializing
+    person_json = Column(LargeBinary, nullable=True)
@@ -1,48 +1,163 @@
+import asyncio
+import json
+import os
 import pytest
 from fastapi.testclient import TestClient
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy import event, select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.pool import StaticPool
 
+# The app's own database is never used in tests; skip its startup DDL
+os.environ.setdefault("AUTO_CREATE_TABLES", "false")
+
+import cache
 from main import app
-from database import Base, get_db
+import database
+from database import Base
 from models import PersonModel
 
 # Create in-memory SQLite database for testing
-SQLALCHEMY_DATABASE_URL = "sqlite:///:memory:"
+SQLALCHEMY_DATABASE_URL = "sqlite+aiosqlite:///:memory:"
 
-engine = create_engine(
+engine = create_async_engine(
     SQLALCHEMY_DATABASE_URL,
     connect_args={"check_same_thread": False},
     poolclass=StaticPool,
 )
-TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 
-def override_get_db():
-    """Override the database dependency for testing"""
-    try:
-        db = TestingSessionLocal()
-        yield db
-    finally:
-        db.close()
+# Let SQLAlchemy emit BEGIN itself so SAVEPOINTs nest inside the per-test
+# transaction (the sqlite3 driver's implicit transactions break this)
+@event.listens_for(engine.sync_engine, "connect")
+def do_connect(dbapi_connection, connection_record):
+    dbapi_connection.isolation_level = None
+
+
+@event.listens_for(engine.sync_engine, "begin")
+def do_begin(conn):
+    conn.exec_driver_sql("BEGIN")
+
+# Sessions join the per-test transaction through a SAVEPOINT, so handler
+# commits and rollbacks never end the outer transaction
+TestingSessionLocal = async_sessionmaker(
+    class_=AsyncSession,
+    autoflush=False,
+    expire_on_commit=False,
+    join_transaction_mode="create_savepoint",
+)
+
+
+async def open_connection():
+    conn = await engine.connect()
+    await conn.run_sync(Base.metadata.create_all)
+    await conn.commit()
+    return conn
+
+
+async def begin_transaction(conn):
+    return await conn.begin()
+
+
+async def close_connection(conn):
+    await conn.run_sync(Base.metadata.drop_all)
+    await conn.commit()
+    await conn.close()
+
+
+async def insert_legacy_person(conn):
+    await conn.execute(PersonModel.__table__.insert().values(
+        name="Legacy", age=50, email="legacy@example.com"
+    ))
+
+
+async def fetch_person_json(conn, person_id):
+    table = PersonModel.__table__
+    return await conn.scalar(
+        select(table.c.person_json).where(table.c.id == person_id)
+    )
+
+
+@pytest.fixture(scope="module")
+def connection():
+    """Create the schema and a shared connection once per test module"""
+    conn = asyncio.run(open_connection())
+    yield conn
+    asyncio.run(close_connection(conn))
 
 
 @pytest.fixture(scope="function")
-def test_db():
-    """Create a fresh database for each test"""
-    Base.metadata.create_all(bind=engine)
-    yield
-    Base.metadata.drop_all(bind=engine)
+def test_db(connection):
+    """Run each test inside a transaction that is rolled back on teardown"""
+    transaction = asyncio.run(begin_transaction(connection))
+    yield connection
+    asyncio.run(transaction.rollback())
 
 
 @pytest.fixture(scope="function")
-def client(test_db):
-    """Create a test client with database override"""
-    app.dependency_overrides[get_db] = override_get_db
+def client(test_db, monkeypatch):
+    """Create a test client whose request sessions use the test connection"""
+    TestingSessionLocal.configure(bind=test_db)
+    monkeypatch.setattr(database, "SessionLocal", TestingSessionLocal)
     with TestClient(app) as test_client:
         yield test_client
-    app.dependency_overrides.clear()
+
+
+class FakePipeline:
+    """Queues commands and applies them on execute, like a MULTI/EXEC block"""
+    
+    def __init__(self, redis):
+        self.redis = redis
+        self.commands = []
+    
+    def incr(self, key):
+        self.commands.append(lambda: self.redis.incr(key))
+        return self
+    
+    def expire(self, key, seconds):
+        self.commands.append(lambda: None)
+        return self
+    
+    def delete(self, key):
+        self.commands.append(lambda: self.redis.store.pop(key, None))
+        return self
+    
+    async def execute(self):
+        return [command() for command in self.commands]
+
+
+class FakeRedis:
+    """Minimal in-memory stand-in for the redis.asyncio client"""
+    
+    def __init__(self):
+        self.store = {}
+    
+    def incr(self, key):
+        value = int(self.store.get(key, b"0")) + 1
+        self.store[key] = str(value).encode()
+        return value
+    
+    async def mget(self, *keys):
+        return [self.store.get(key) for key in keys]
+    
+    async def eval(self, script, numkeys, key, version_key, body, version, ttl):
+        # Emulates cache.CACHE_IF_CURRENT
+        assert script == cache.CACHE_IF_CURRENT
+        if self.store.get(version_key, b"0") == version:
+            self.store[key] = body
+    
+    def pipeline(self, transaction=True):
+        return FakePipeline(self)
+    
+    async def aclose(self):
+        pass
+
+
+@pytest.fixture(scope="function")
+def fake_redis(monkeypatch):
+    """Enable the person cache against an in-memory fake"""
+    fake = FakeRedis()
+    monkeypatch.setattr(cache, "redis_client", fake)
+    return fake
 
 
 class TestRootEndpoint:
@@ -130,6 +245,14 @@ class TestCreatePerson:
         response = client.post("/persons", json=incomplete_data)
         assert response.status_code == 422  # Validation error
     
+    def test_create_person_missing_field_error_detail(self, client):
+        """Test a missing field is reported with its location"""
+        response = client.post("/persons", json={"name": "John Doe", "age": 30})
+        assert response.status_code == 422
+        error = response.json()["detail"][0]
+        assert error["type"] == "missing"
+        assert error["loc"] == ["body", "email"]
+    
     def test_create_person_invalid_age_type(self, client):
         """Test creating person with invalid age type"""
         invalid_data = {
@@ -139,6 +262,26 @@ class TestCreatePerson:
         }
         response = client.post("/persons", json=invalid_data)
         assert response.status_code == 422
+        error = response.json()["detail"][0]
+        assert error["type"] == "int_parsing"
+        assert error["loc"] == ["body", "age"]
+    
+    def test_create_person_malformed_json(self, client):
+        """Test creating person with a body that is not valid JSON"""
+        response = client.post(
+            "/persons",
+            content=b'{"name": "John Doe",',
+            headers={"Content-Type": "application/json"}
+        )
+        assert response.status_code == 422
+        assert response.json()["detail"][0]["type"] == "json_invalid"
+    
+    def test_create_person_documents_request_body(self, client):
+        """Test the request body schema is still published in OpenAPI"""
+        schema = client.get("/openapi.json").json()
+        body = schema["paths"]["/persons"]["post"]["requestBody"]
+        properties = body["content"]["application/json"]["schema"]["properties"]
+        assert set(properties) == {"name", "age", "email"}
     
     def test_create_person_negative_age(self, client):
         """Test creating person with negative age (currently allowed, could add validation)"""
@@ -151,6 +294,60 @@ class TestCreatePerson:
         assert response.status_code == 201  # Currently passes, could add validation
 
 
+class TestCreatePersonsBulk:
+    """Tests for POST /persons/bulk endpoint"""
+    
+    def test_create_persons_bulk_success(self, client):
+        """Test creating several persons in one request"""
+        persons = [
+            {"name": "Alice", "age": 25, "email": "alice@example.com"},
+            {"name": "Bob", "age": 35, "email": "bob@example.com"}
+        ]
+        response = client.post("/persons/bulk", json=persons)
+        assert response.status_code == 201
+        data = response.json()
+        assert [p["id"] for p in data] == [1, 2]
+        assert [p["name"] for p in data] == ["Alice", "Bob"]
+        assert len(client.get("/persons").json()) == 2
+    
+    def test_create_persons_bulk_stores_json(self, client, test_db):
+        """Test the bulk INSERT writes each stored body"""
+        persons = [
+            {"name": "Alice", "age": 25, "email": "alice@example.com"},
+            {"name": "Bob", "age": 35, "email": "bob@example.com"}
+        ]
+        data = client.post("/persons/bulk", json=persons).json()
+        for person, stored in zip(persons, data):
+            person_json = asyncio.run(fetch_person_json(test_db, stored["id"]))
+            assert json.loads(person_json) == person
+    
+    def test_create_persons_bulk_empty(self, client):
+        """Test an empty list creates nothing"""
+        response = client.post("/persons/bulk", json=[])
+        assert response.status_code == 201
+        assert response.json() == []
+    
+    def test_create_persons_bulk_duplicate_email(self, client):
+        """Test a duplicate email rejects the whole batch"""
+        client.post("/persons", json={"name": "Alice", "age": 25, "email": "alice@example.com"})
+        persons = [
+            {"name": "Bob", "age": 35, "email": "bob@example.com"},
+            {"name": "Alice Again", "age": 26, "email": "alice@example.com"}
+        ]
+        response = client.post("/persons/bulk", json=persons)
+        assert response.status_code == 400
+        assert response.json()["detail"] == "Email already registered"
+        assert len(client.get("/persons").json()) == 1
+    
+    def test_create_persons_bulk_invalid_item(self, client):
+        """Test an invalid item fails validation"""
+        response = client.post("/persons/bulk", json=[{"name": "Bob", "age": 35}])
+        assert response.status_code == 422
+        error = response.json()["detail"][0]
+        assert error["type"] == "missing"
+        assert error["loc"] == ["body", 0, "email"]
+
+
 class TestGetAllPersons:
     """Tests for GET /persons endpoint"""
     
@@ -199,6 +396,27 @@ class TestGetPerson:
         assert data["age"] == 30
         assert data["email"] == "john@example.com"
     
+    def test_get_person_without_stored_json(self, client, test_db):
+        """Test rows written before person_json existed are still served"""
+        asyncio.run(insert_legacy_person(test_db))
+        
+        response = client.get("/persons/1")
+        assert response.status_code == 200
+        assert response.json() == {"id": 1, "name": "Legacy", "age": 50, "email": "legacy@example.com"}
+        assert client.get("/persons").json() == [response.json()]
+    
+    def test_get_all_persons_mixes_stored_and_legacy_rows(self, client, test_db):
+        """Test the list serves stored bodies and encodes legacy rows"""
+        asyncio.run(insert_legacy_person(test_db))
+        client.post("/persons", json={"name": "John", "age": 30, "email": "john@example.com"})
+        
+        response = client.get("/persons")
+        assert response.status_code == 200
+        assert response.json() == [
+            {"id": 1, "name": "Legacy", "age": 50, "email": "legacy@example.com"},
+            {"id": 2, "name": "John", "age": 30, "email": "john@example.com"}
+        ]
+    
     def test_get_person_not_found(self, client):
         """Test getting non-existent person returns 404"""
         response = client.get("/persons/999")
@@ -246,6 +464,45 @@ class TestUpdatePerson:
         assert data["age"] == 31  # Changed
         assert data["email"] == "john@example.com"  # Unchanged
     
+    def test_update_person_stores_json(self, client, test_db):
+        """Test full and partial updates rewrite the stored body"""
+        create_response = client.post("/persons", json={"name": "John", "age": 30, "email": "john@example.com"})
+        person_id = create_response.json()["id"]
+        
+        client.put(f"/persons/{person_id}", json={"name": "Jane", "age": 28, "email": "jane@example.com"})
+        person_json = asyncio.run(fetch_person_json(test_db, person_id))
+        assert json.loads(person_json) == {"name": "Jane", "age": 28, "email": "jane@example.com"}
+        
+        client.put(f"/persons/{person_id}", json={"age": 29})
+        person_json = asyncio.run(fetch_person_json(test_db, person_id))
+        assert json.loads(person_json) == {"name": "Jane", "age": 29, "email": "jane@example.com"}
+    
+    def test_update_person_stores_json_after_concurrent_change(self, client, test_db):
+        """Test a partial update's stored body reflects a change made just before its write"""
+        create_response = client.post("/persons", json={"name": "Old", "age": 1, "email": "old@example.com"})
+        person_id = create_response.json()["id"]
+        
+        # Simulate another request committing name="New" right before this
+        # request's UPDATE reaches the database
+        injected = []
+        
+        def concurrent_write(conn, cursor, statement, parameters, context, executemany):
+            if not injected and statement.startswith("UPDATE persons"):
+                injected.append(True)
+                conn.exec_driver_sql("UPDATE persons SET name = 'New' WHERE id = ?", (person_id,))
+        
+        event.listen(engine.sync_engine, "before_cursor_execute", concurrent_write)
+        try:
+            response = client.put(f"/persons/{person_id}", json={"age": 2})
+        finally:
+            event.remove(engine.sync_engine, "before_cursor_execute", concurrent_write)
+        
+        assert injected
+        expected = {"name": "New", "age": 2, "email": "old@example.com"}
+        assert response.json() == {"id": person_id, **expected}
+        person_json = asyncio.run(fetch_person_json(test_db, person_id))
+        assert json.loads(person_json) == expected
+    
     def test_update_person_not_found(self, client):
         """Test updating non-existent person returns 404"""
         update_data = {"name": "Jane Doe"}
@@ -266,6 +523,20 @@ class TestUpdatePerson:
         assert response.status_code == 400
         assert response.json()["detail"] == "Email already registered"
     
+    def test_update_person_duplicate_email_leaves_person_unchanged(self, client):
+        """Test a rejected email update does not persist any other field"""
+        client.post("/persons", json={"name": "Alice", "age": 25, "email": "alice@example.com"})
+        create_response = client.post("/persons", json={"name": "Bob", "age": 35, "email": "bob@example.com"})
+        bob_id = create_response.json()["id"]
+        
+        update_data = {"name": "Robert", "email": "alice@example.com"}
+        response = client.put(f"/persons/{bob_id}", json=update_data)
+        assert response.status_code == 400
+        
+        data = client.get(f"/persons/{bob_id}").json()
+        assert data["name"] == "Bob"
+        assert data["email"] == "bob@example.com"
+    
     def test_update_person_same_email(self, client):
         """Test updating person with their own email (should succeed)"""
         # Create a person
@@ -338,6 +609,57 @@ class TestDeletePerson:
         assert response.status_code == 404
 
 
+class TestPersonCache:
+    """Tests for the Redis read-through cache on GET /persons/{person_id}"""
+    
+    def test_get_person_populates_cache(self, client, fake_redis):
+        """Test a cache miss stores the person body"""
+        create_response = client.post("/persons", json={"name": "John", "age": 30, "email": "john@example.com"})
+        person_id = create_response.json()["id"]
+        
+        response = client.get(f"/persons/{person_id}")
+        assert response.status_code == 200
+        assert fake_redis.store[f"persons:{person_id}"] == response.content
+    
+    def test_get_person_served_from_cache(self, client, fake_redis):
+        """Test a cache hit is returned without touching the database"""
+        fake_redis.store["persons:42"] = b'{"id":42,"name":"Cached","age":1,"email":"c@example.com"}'
+        response = client.get("/persons/42")
+        assert response.status_code == 200
+        assert response.json()["name"] == "Cached"
+    
+    def test_stale_read_not_cached_after_invalidation(self, fake_redis):
+        """Test a body read before a concurrent invalidation is not cached"""
+        async def race():
+            _, version = await cache.get_cached_person(1)
+            # A PUT commits and invalidates while the GET reads the old row
+            await cache.invalidate_person(1)
+            await cache.cache_person(1, b'{"id":1,"name":"Old"}', version)
+        
+        asyncio.run(race())
+        assert "persons:1" not in fake_redis.store
+    
+    def test_update_person_invalidates_cache(self, client, fake_redis):
+        """Test updating a person drops the cached body"""
+        create_response = client.post("/persons", json={"name": "John", "age": 30, "email": "john@example.com"})
+        person_id = create_response.json()["id"]
+        client.get(f"/persons/{person_id}")
+        
+        client.put(f"/persons/{person_id}", json={"age": 31})
+        assert f"persons:{person_id}" not in fake_redis.store
+        assert client.get(f"/persons/{person_id}").json()["age"] == 31
+    
+    def test_delete_person_invalidates_cache(self, client, fake_redis):
+        """Test deleting a person drops the cached body"""
+        create_response = client.post("/persons", json={"name": "John", "age": 30, "email": "john@example.com"})
+        person_id = create_response.json()["id"]
+        client.get(f"/persons/{person_id}")
+        
+        client.delete(f"/persons/{person_id}")
+        assert f"persons:{person_id}" not in fake_redis.store
+        assert client.get(f"/persons/{person_id}").status_code == 404
+
+
 class TestIntegrationScenarios:
     """Integration tests covering complete workflows"""
     